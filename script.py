@@ -1,27 +1,116 @@
-import requests
-import schedule
+import asyncio
+import hashlib
+import html
+import httpx
+import ijson
+import orjson
 import time
 import logging
 import openai
 import os
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import re
+import sqlite3
+import tiktoken
+from bs4 import BeautifulSoup
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from openai import AsyncOpenAI
+from email.utils import parsedate_to_datetime
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 
 # Load environment variables from a .env file
 from dotenv import load_dotenv
 load_dotenv('credentials.env')
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, filename='newsblur_telegram_bot.log', filemode='a',
+# Configure logging; set LOG_LEVEL=DEBUG for verbose output
+log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+logging.basicConfig(level=log_level, filename='newsblur_telegram_bot.log', filemode='a',
                     format='%(asctime)s - %(levelname)s - %(message)s')
 console = logging.StreamHandler()
-console.setLevel(logging.DEBUG)
+console.setLevel(log_level)
 formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 console.setFormatter(formatter)
 logging.getLogger('').addHandler(console)
+# httpx logs every request URL at INFO, and Telegram URLs contain the bot token
+logging.getLogger('httpx').setLevel(logging.WARNING)
+logging.getLogger('httpcore').setLevel(logging.WARNING)
+
+
+class ResponseReader:
+    """
+    Adapts a streamed httpx response to the async file-like interface ijson reads from.
+    """
+    def __init__(self, response):
+        self.chunks = response.aiter_bytes()
+
+    async def read(self, size=-1):
+        # ijson probes the stream type with read(0), which must not consume a chunk
+        if size == 0:
+            return b''
+        return await anext(self.chunks, b'')
+
+
+class WaitRetryAfter:
+    """
+    Tenacity wait strategy that honors the Retry-After header of OpenAI error responses
+    and falls back to exponential backoff with jitter.
+    """
+    def __init__(self, fallback, max_wait=60):
+        self.fallback = fallback
+        self.max_wait = max_wait
+
+    def __call__(self, retry_state):
+        error = retry_state.outcome.exception()
+        response = getattr(error, 'response', None)
+        if response is not None:
+            retry_after = response.headers.get('retry-after')
+            if retry_after:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    try:
+                        delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                    except (TypeError, ValueError):
+                        delay = None
+                if delay is not None:
+                    return min(max(delay, 0), self.max_wait)
+        return self.fallback(retry_state)
 
 
 class NewsBlurTelegramBot:
+    # Articles are classified in batches; each batch is capped both by count and by prompt size
+    max_batch_size = 25
+    batch_token_budget = 8000
+    # Article text is stripped of HTML and truncated; classification only needs the lead
+    article_token_limit = 800
+    classification_token_limit = 200
+    # Number of prepared article texts kept in memory, keyed by content hash
+    prepared_cache_size = 1024
+    # Only these story fields are kept while stream-parsing the NewsBlur response
+    story_fields = ('story_title', 'story_content', 'story_permalink')
+    # Maximum number of concurrent OpenAI requests
+    max_concurrent_requests = 10
+    # Classification results are cached by content hash for a week
+    cache_path = 'newsblur_telegram_bot_cache.db'
+    cache_ttl = 7 * 24 * 60 * 60
+
+    # Telegram message layout; all fields are HTML-escaped before formatting
+    message_header = "<b>📰 New Important Articles:</b>\n\n"
+    article_template = '<b>🔗 Title:</b> <a href="{url}">{title}</a>\n<b>📝 Summary:</b> {summary}\n\n'
+
+    # Cheap local pre-filter applied before any OpenAI request
+    min_content_length = 300
+    low_value_title = re.compile(
+        r"\b(sponsored|advertisement|giveaway|coupons?|promo codes?|horoscopes?|quiz|crossword|"
+        r"recipes?|gift guide|best .+ to buy)\b",
+        re.IGNORECASE
+    )
+
+    # A small model judges importance, the larger one only summarizes the articles that pass
+    classification_model = "gpt-4o-mini"
+    classification_prompt = "You are a news assistant. You will be provided with a numbered list of article contents. For each article, determine if it contains critical or significant information that would be of interest to a general audience. Focus on breaking news, impactful events, major discoveries, or anything particularly insightful. Limit your selection to only highly important articles to ensure that no more than 4-5 highly relevant articles are shared at any time. Respond with a JSON object of the form {\"articles\": [{\"id\": 1, \"important\": true}, {\"id\": 2, \"important\": false}, ...]} containing one entry per article."
+    summary_model = "gpt-4o"
+    summary_prompt = "You are a news assistant. You will be provided with a numbered list of article contents. For each article, provide a clear, concise, and engaging 2-3 sentence summary, focusing on the key points and making it informative for a general audience. Respond with a JSON object of the form {\"articles\": [{\"id\": 1, \"summary\": \"...\"}, ...]} containing one entry per article."
+
     def __init__(self):
         # Environment Variables
         self.newsblur_api_url = 'https://www.newsblur.com'
@@ -30,113 +119,518 @@ class NewsBlurTelegramBot:
         self.tele_token = os.getenv('TELE_TOKEN')
         self.tele_chat = os.getenv('TELE_CHAT')
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        logging.debug(f"Loaded OpenAI API key: {self.openai_api_key}")
-        logging.debug(f"NEWSBLUR_USER: {self.newsblur_user}")
-        logging.debug(f"NEWSBLUR_PASS: {self.newsblur_pass}")
-        logging.debug(f"TELE_TOKEN: {self.tele_token}")
-        logging.debug(f"TELE_CHAT: {self.tele_chat}")
-        if not self.openai_api_key:
-            logging.error("No OpenAI API key provided. Please set the OPENAI_API_KEY environment variable.")
-        if not self.tele_token or not self.tele_chat:
-            logging.error("Telegram credentials missing. Please set the TELE_TOKEN and TELE_CHAT environment variables.")
-
-        # Initialize OpenAI API key
-        openai.api_key = self.openai_api_key
-
-        # Create a single session with retry strategy
-        self.session = requests.Session()
-        retry = Retry(connect=3, backoff_factor=0.5)
-        adapter = HTTPAdapter(max_retries=retry)
-        self.session.mount('http://', adapter)
-        self.session.mount('https://', adapter)
-
-    def openai_request(self, model, system_message, user_message):
-        try:
-            response = openai.ChatCompletion.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ]
+        self.use_batch_api = os.getenv('OPENAI_BATCH_API', '').lower() in ('1', 'true', 'yes')
+        # Fail fast instead of erroring deep inside the first job
+        required = {
+            'NEWSBLUR_USER': self.newsblur_user,
+            'NEWSBLUR_PASS': self.newsblur_pass,
+            'TELE_TOKEN': self.tele_token,
+            'TELE_CHAT': self.tele_chat,
+            'OPENAI_API_KEY': self.openai_api_key
+        }
+        missing = [name for name, value in required.items() if not value]
+        if missing:
+            raise SystemExit(f"Missing environment variables: {', '.join(missing)}. Please set them in credentials.env.")
+
+        # Initialize one OpenAI client whose HTTP/2 connection is reused by all requests;
+        # retries are handled by tenacity in openai_request
+        self.openai_client = AsyncOpenAI(
+            api_key=self.openai_api_key,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                timeout=60,
+                transport=httpx.AsyncHTTPTransport(
+                    http2=True, limits=httpx.Limits(max_keepalive_connections=self.max_concurrent_requests)
+                )
+            )
+        )
+        self.encoding = tiktoken.encoding_for_model(self.classification_model)
+        self.cache = sqlite3.connect(self.cache_path)
+        self.cache.execute(
+            "CREATE TABLE IF NOT EXISTS results (hash TEXT PRIMARY KEY, important INT, summary TEXT, ts INT)"
+        )
+        self.cache.commit()
+        # Batch API jobs awaiting results: batch id -> {custom_id: stories}
+        self.pending_batches = {}
+        # Prepared article tokens: content hash -> tokens, oldest entries evicted first
+        self.prepared = {}
+
+        # Create a single HTTP/2 session that retries failed connections
+        self.session = httpx.AsyncClient(
+            timeout=30,
+            transport=httpx.AsyncHTTPTransport(
+                http2=True, retries=3, limits=httpx.Limits(max_keepalive_connections=20)
             )
-            return response.choices[0].message['content'].strip()
-        except openai.error.OpenAIError as e:
-            logging.error(f"Error during OpenAI request: {e}")
+        )
+
+    async def openai_request(self, model, system_message, user_message, response_format=None):
+        extra = {'response_format': response_format} if response_format else {}
+        try:
+            async for attempt in AsyncRetrying(
+                retry=retry_if_exception_type(
+                    (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+                ),
+                wait=WaitRetryAfter(wait_exponential_jitter(initial=1, max=30)),
+                stop=stop_after_attempt(6),
+                reraise=True
+            ):
+                with attempt:
+                    response = await self.openai_client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": system_message},
+                            {"role": "user", "content": user_message}
+                        ],
+                        **extra
+                    )
+        except openai.OpenAIError as e:
+            logging.error("Error during OpenAI request: %s", e)
+            return None
+
+        content = response.choices[0].message.content if response.choices else None
+        if content is None:
+            # Refusals and other empty completions are treated like failed requests
+            logging.error("OpenAI request returned no content.")
             return None
+        return content.strip()
 
-    def fetch_newsblur_articles(self):
+    async def fetch_newsblur_articles(self):
         """
-        Logs into NewsBlur and fetches the latest articles.
-        Returns:
-            list: A list of articles fetched from NewsBlur.
+        Logs into NewsBlur and streams the latest articles.
+        Yields:
+            dict: An article fetched from NewsBlur, reduced to the fields in story_fields.
         """
         logging.debug("Starting to fetch NewsBlur articles...")
         login_payload = {'username': self.newsblur_user, 'password': self.newsblur_pass}
         try:
-            login_response = self.session.post(f'{self.newsblur_api_url}/api/login', data=login_payload)
+            login_response = await self.session.post(f'{self.newsblur_api_url}/api/login', data=login_payload)
             login_response.raise_for_status()
-        except requests.RequestException as e:
-            logging.error(f"Failed to login to NewsBlur: {e}")
-            return []
+            login_result = orjson.loads(login_response.content)
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            logging.error("Failed to login to NewsBlur: %s", e)
+            return
+
+        # NewsBlur answers failed logins with a 200 response
+        if not login_result.get('authenticated'):
+            logging.error("Failed to login to NewsBlur: %s", login_result.get('errors'))
+            return
 
         logging.debug("Logged into NewsBlur successfully.")
 
+        field_prefixes = {f'stories.item.{field}': field for field in self.story_fields}
+        count = 0
         try:
-            stories_response = self.session.get(f'{self.newsblur_api_url}/reader/river_stories')
-            stories_response.raise_for_status()
-        except requests.RequestException as e:
-            logging.error(f"Failed to fetch stories: {e}")
-            return []
-
-        logging.debug("Fetched stories successfully.")
-        return stories_response.json().get('stories', [])
-
-    def is_article_important(self, content):
-        logging.debug("Checking if the article is important using GPT-4...")
-        result = self.openai_request(
-            model="gpt-4",
-            system_message="You are a news assistant. You will be provided with the content of an article. Your task is to determine if the article contains critical or significant information that would be of interest to a general audience. Focus on breaking news, impactful events, major discoveries, or anything particularly insightful. Limit your response to only selecting highly important articles to ensure that no more than 4-5 highly relevant articles are shared at any time. Please respond with either 'important' or 'not important'.",
-            user_message=f"Article content: {content}"
+            async with self.session.stream('GET', f'{self.newsblur_api_url}/reader/river_stories') as stories_response:
+                stories_response.raise_for_status()
+                story = {}
+                async for prefix, event, value in ijson.parse_async(ResponseReader(stories_response)):
+                    if prefix in field_prefixes:
+                        story[field_prefixes[prefix]] = value
+                    elif prefix == 'stories.item' and event == 'end_map':
+                        yield story
+                        story = {}
+                        count += 1
+        except (httpx.HTTPError, ijson.JSONError) as e:
+            logging.error("Failed to fetch stories: %s", e)
+            return
+
+        logging.debug("Fetched %s stories successfully.", count)
+
+    def _prep(self, story):
+        """
+        Strips the HTML from an article and truncates it to article_token_limit tokens.
+        Returns:
+            list: The tokens of the article text.
+        """
+        content_hash = self.content_hash(story)
+        tokens = self.prepared.get(content_hash)
+        if tokens is None:
+            text = BeautifulSoup(story.get('story_content', ''), "lxml").get_text(" ", strip=True)
+            # encode_ordinary treats special-token strings such as <|endoftext|> in articles as plain text
+            tokens = self.encoding.encode_ordinary(text)[:self.article_token_limit]
+            if len(self.prepared) >= self.prepared_cache_size:
+                del self.prepared[next(iter(self.prepared))]
+            self.prepared[content_hash] = tokens
+        return tokens
+
+    def build_batch_message(self, stories, token_limit):
+        return "Articles:\n" + "\n".join(
+            f"[{i}] {self.encoding.decode(self._prep(story)[:token_limit])}"
+            for i, story in enumerate(stories, start=1)
         )
-        logging.debug(f"GPT-4 response for importance: {result}")
-        return result == 'important' if result else False
-
-    def summarize_article(self, content):
-        logging.debug("Generating summary for the article using GPT-4...")
-        summary = self.openai_request(
-            model="gpt-4",
-            system_message="You are a news assistant. Please provide a clear, concise, and engaging 2-3 sentence summary of the following article content, focusing on the key points and making it informative for a general audience.",
-            user_message=f"Article content: {content}"
+
+    def chunk_stories(self, stories, token_limit):
+        """
+        Splits stories into batches that respect both the batch size and the prompt token budget.
+        Returns:
+            list: A list of story lists.
+        """
+        batches, batch, batch_tokens = [], [], 0
+        for story in stories:
+            tokens = min(len(self._prep(story)), token_limit)
+            if batch and (len(batch) >= self.max_batch_size or batch_tokens + tokens > self.batch_token_budget):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(story)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def parse_batch_response(self, stories, result):
+        """
+        Maps a batch response back onto the stories it was requested for.
+        Returns:
+            list: The response entry for each story, in order, or None for stories missing from the response.
+        """
+        entries = [None for _ in stories]
+        if not result:
+            return entries
+
+        try:
+            articles = orjson.loads(result).get('articles', [])
+        except (orjson.JSONDecodeError, AttributeError) as e:
+            logging.error("Failed to parse GPT response: %s", e)
+            return entries
+        if not isinstance(articles, list):
+            logging.error("Failed to parse GPT response: 'articles' is not a list")
+            return entries
+
+        for entry in articles:
+            if not isinstance(entry, dict):
+                continue
+            index = entry.get('id')
+            # bool is a subclass of int, so ids like true must be rejected explicitly
+            if isinstance(index, int) and not isinstance(index, bool) and 1 <= index <= len(stories):
+                entries[index - 1] = entry
+        return entries
+
+    def parse_classification(self, stories, result):
+        """
+        Returns:
+            list: One {'important': bool, 'summary': None} dict per story, in order,
+                  or None for stories the response has no verdict for.
+        """
+        return [
+            {'important': entry.get('important') is True, 'summary': None} if entry else None
+            for entry in self.parse_batch_response(stories, result)
+        ]
+
+    async def classify_batch(self, stories):
+        """
+        Judges the importance of a batch of articles in a single GPT request.
+        Returns:
+            list: One {'important': bool, 'summary': None} dict (or None) per story, in order.
+        """
+        logging.debug("Classifying a batch of %s articles using %s...", len(stories), self.classification_model)
+        result = await self.openai_request(
+            model=self.classification_model,
+            system_message=self.classification_prompt,
+            user_message=self.build_batch_message(stories, self.classification_token_limit),
+            response_format={"type": "json_object"}
         )
-        logging.debug(f"GPT-4 summary: {summary}")
-        return summary if summary else "Summary could not be generated."
+        logging.debug("%s response: %s", self.classification_model, result)
+        return self.parse_classification(stories, result)
 
-    def filter_important_articles(self, stories):
+    async def summarize_batch(self, stories):
+        """
+        Summarizes a batch of articles in a single GPT request.
+        Returns:
+            list: The summary for each story, in order, or None if none was generated.
+        """
+        logging.debug("Summarizing a batch of %s articles using %s...", len(stories), self.summary_model)
+        result = await self.openai_request(
+            model=self.summary_model,
+            system_message=self.summary_prompt,
+            user_message=self.build_batch_message(stories, self.article_token_limit),
+            response_format={"type": "json_object"}
+        )
+        logging.debug("%s response: %s", self.summary_model, result)
+        summaries = []
+        for entry in self.parse_batch_response(stories, result):
+            summary = entry.get('summary') if entry else None
+            # Anything but a non-empty string would break caching and HTML escaping
+            summaries.append(summary.strip() if isinstance(summary, str) and summary.strip() else None)
+        return summaries
+
+    async def _process(self, batch, semaphore, request):
+        async with semaphore:
+            return await request(batch)
+
+    async def run_batches(self, request, stories, token_limit):
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        batches = self.chunk_stories(stories, token_limit)
+        tasks = [asyncio.create_task(self._process(batch, semaphore, request)) for batch in batches]
+        return batches, await asyncio.gather(*tasks)
+
+    async def complete_results(self, batches, results):
+        """
+        Summarizes the stories classified as important, caches the verdicts and collects the important articles.
+        Important stories whose summary could not be generated are not cached, so they are retried next run.
+        """
+        important = [
+            (story, result)
+            for batch, batch_results in zip(batches, results)
+            for story, result in zip(batch, batch_results)
+            if result and result['important']
+        ]
+        if important:
+            _, summaries = await self.run_batches(
+                self.summarize_batch, [story for story, _ in important], self.article_token_limit
+            )
+            for (_, result), summary in zip(important, (summary for batch in summaries for summary in batch)):
+                result['summary'] = summary
+
+        self.cache_results(batches, [
+            [result if result and (not result['important'] or result['summary']) else None for result in batch_results]
+            for batch_results in results
+        ])
+        return self.collect_important_articles(batches, results)
+
+    def prefilter(self, stories):
+        """
+        Drops stories that are too short or whose title marks them as low value, without any OpenAI request.
+        """
+        candidates = [
+            story for story in stories
+            if len(story.get('story_content') or '') >= self.min_content_length
+            and not self.low_value_title.search(story.get('story_title') or '')
+        ]
+        logging.debug("%s of %s articles passed the pre-filter.", len(candidates), len(stories))
+        return candidates
+
+    def collect_important_articles(self, batches, results):
+        important_articles = []
+        for batch, batch_results in zip(batches, results):
+            for story, result in zip(batch, batch_results):
+                if not result or not result['important']:
+                    continue
+                important_articles.append({
+                    'title': story.get('story_title'),
+                    'summary': result['summary'] or "Summary could not be generated.",
+                    'url': story.get('story_permalink'),
+                    'hash': self.content_hash(story)
+                })
+        return important_articles
+
+    def group_duplicates(self, stories):
+        """
+        Groups stories with identical content, such as crossposts, so each body is classified only once.
+        Returns:
+            dict: Content hash -> stories with that content; the first story represents the group.
+        """
+        groups = {}
+        for story in stories:
+            groups.setdefault(self.content_hash(story), []).append(story)
+        return groups
+
+    def fan_out(self, important_articles, groups):
+        """
+        Expands each important article to every story in its duplicate group, reusing its summary.
+        Stories with a permalink that was already listed are skipped.
+        """
+        articles, seen_urls = [], set()
+        for article in important_articles:
+            for story in groups.get(article['hash'], [None]):
+                url = story.get('story_permalink') if story else article['url']
+                # Stories without a permalink cannot be told apart by URL, so they are always kept
+                if url and url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                articles.append({
+                    'title': story.get('story_title') if story else article['title'],
+                    'summary': article['summary'],
+                    'url': url
+                })
+        return articles
+
+    def content_hash(self, story):
+        return hashlib.blake2b(story.get('story_content', '').encode(), digest_size=16).hexdigest()
+
+    def prune_cache(self):
+        self.cache.execute("DELETE FROM results WHERE ts < ?", (int(time.time()) - self.cache_ttl,))
+        self.cache.commit()
+
+    def split_cached(self, stories):
+        """
+        Separates the stories with a cached classification from the rest.
+        Returns:
+            tuple: (cached stories, their cached results, uncached stories)
+        """
+        cached_stories, cached_results, uncached_stories = [], [], []
+        for story in stories:
+            row = self.cache.execute(
+                "SELECT important, summary FROM results WHERE hash = ?", (self.content_hash(story),)
+            ).fetchone()
+            if row:
+                cached_stories.append(story)
+                cached_results.append({'important': bool(row[0]), 'summary': row[1]})
+            else:
+                uncached_stories.append(story)
+
+        logging.debug("%s of %s unique articles found in cache.", len(cached_stories), len(stories))
+        return cached_stories, cached_results, uncached_stories
+
+    def cache_results(self, batches, results):
+        now = int(time.time())
+        self.cache.executemany(
+            "INSERT OR REPLACE INTO results (hash, important, summary, ts) VALUES (?, ?, ?, ?)",
+            [
+                (self.content_hash(story), int(result['important']), result['summary'], now)
+                for batch, batch_results in zip(batches, results)
+                for story, result in zip(batch, batch_results)
+                if result
+            ]
+        )
+        self.cache.commit()
+
+    async def classify_uncached(self, stories):
+        batches, results = await self.run_batches(self.classify_batch, stories, self.classification_token_limit)
+        return await self.complete_results(batches, results)
+
+    async def filter_important_articles(self, stories):
         logging.debug("Filtering important articles...")
-        important_articles = [
-            {
-                'title': story.get('story_title'),
-                'summary': self.summarize_article(story.get('story_content', '')),
-                'url': story.get('story_permalink')
-            }
-            for story in stories
-            if self.is_article_important(story.get('story_content', ''))
-        ]  # Limit to 4 articles
-
-        logging.debug(f"Found {len(important_articles)} important articles.")
+        groups = self.group_duplicates(self.prefilter(stories))
+        cached_stories, cached_results, uncached_stories = self.split_cached([group[0] for group in groups.values()])
+        important_articles = self.collect_important_articles([cached_stories], [cached_results])
+        important_articles.extend(await self.classify_uncached(uncached_stories))
+        important_articles = self.fan_out(important_articles, groups)
+        logging.debug("Found %s important articles.", len(important_articles))
         return important_articles
 
+    async def create_batch(self, stories):
+        """
+        Submits the classification of the given stories as a single OpenAI Batch API job.
+        Results are picked up by collect_batches on a later run, which summarizes the important ones directly.
+        """
+        batches = {
+            f"batch-{i}": batch
+            for i, batch in enumerate(self.chunk_stories(stories, self.classification_token_limit))
+        }
+        lines = [
+            orjson.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.classification_model,
+                    "messages": [
+                        {"role": "system", "content": self.classification_prompt},
+                        {"role": "user", "content": self.build_batch_message(batch, self.classification_token_limit)}
+                    ],
+                    "response_format": {"type": "json_object"}
+                }
+            })
+            for custom_id, batch in batches.items()
+        ]
+        try:
+            input_file = await self.openai_client.files.create(
+                file=("batch.jsonl", b"\n".join(lines)), purpose="batch"
+            )
+            batch_job = await self.openai_client.batches.create(
+                input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+            )
+        except openai.OpenAIError as e:
+            logging.error("Failed to create OpenAI batch, classifying directly instead: %s", e)
+            return await self.classify_uncached(stories)
+
+        self.pending_batches[batch_job.id] = batches
+        logging.info("Submitted OpenAI batch %s with %s articles.", batch_job.id, len(stories))
+        return []
+
+    async def collect_batches(self):
+        """
+        Polls pending Batch API jobs and collects the results of finished ones.
+        Stories whose batch failed or expired, or whose individual request errored, are classified directly.
+        Returns:
+            list: The important articles from all finished batches.
+        """
+        finished_batches, finished_results, stragglers = [], [], []
+        for batch_id, batches in list(self.pending_batches.items()):
+            try:
+                batch_job = await self.openai_client.batches.retrieve(batch_id)
+            except openai.OpenAIError as e:
+                logging.error("Failed to retrieve OpenAI batch %s: %s", batch_id, e)
+                continue
+
+            if batch_job.status in ('validating', 'in_progress', 'finalizing', 'cancelling'):
+                logging.debug("OpenAI batch %s is still %s.", batch_id, batch_job.status)
+                continue
+
+            del self.pending_batches[batch_id]
+            responses = {}
+            if batch_job.status == 'completed' and batch_job.output_file_id:
+                try:
+                    output = await self.openai_client.files.content(batch_job.output_file_id)
+                except openai.OpenAIError as e:
+                    logging.error("Failed to download results of OpenAI batch %s: %s", batch_id, e)
+                else:
+                    for line in output.content.splitlines():
+                        if not line.strip():
+                            continue
+                        try:
+                            item = orjson.loads(line)
+                            response = item.get('response') or {}
+                            if response.get('status_code') == 200:
+                                content = response['body']['choices'][0]['message']['content']
+                                # Refusals come back without content; leave them to the straggler path
+                                if isinstance(content, str) and content.strip():
+                                    responses[item['custom_id']] = content
+                        except (orjson.JSONDecodeError, KeyError, IndexError, TypeError, AttributeError) as e:
+                            # The affected stories fall through to the straggler path below
+                            logging.error("Skipping malformed result line of OpenAI batch %s: %s", batch_id, e)
+            else:
+                logging.error("OpenAI batch %s ended with status %s.", batch_id, batch_job.status)
+
+            for custom_id, stories in batches.items():
+                if custom_id in responses:
+                    finished_batches.append(stories)
+                    finished_results.append(self.parse_classification(stories, responses[custom_id]))
+                else:
+                    stragglers.extend(stories)
+
+        important_articles = await self.complete_results(finished_batches, finished_results)
+        if stragglers:
+            logging.info("Classifying %s articles missing from batch results directly.", len(stragglers))
+            important_articles.extend(await self.classify_uncached(stragglers))
+        return important_articles
+
+    async def process_with_batch_api(self, stories):
+        """
+        Collects finished Batch API results and submits the uncached stories not already pending as a new batch.
+        Returns:
+            list: The important cached articles and those from batches that finished since the last run.
+        """
+        # Look up the cache and pending stories before collecting, so collected results are not reported twice
+        groups = self.group_duplicates(self.prefilter(stories))
+        cached_stories, cached_results, stories = self.split_cached([group[0] for group in groups.values()])
+        pending_hashes = {
+            self.content_hash(story)
+            for batches in self.pending_batches.values()
+            for batch in batches.values()
+            for story in batch
+        }
+        important_articles = await self.collect_batches()
+        important_articles.extend(self.collect_important_articles([cached_stories], [cached_results]))
+        new_stories = [story for story in stories if self.content_hash(story) not in pending_hashes]
+        if new_stories:
+            important_articles.extend(await self.create_batch(new_stories))
+        return self.fan_out(important_articles, groups)
+
     def format_telegram_message(self, articles):
         if not articles:
             return None
 
-        return "<b>📰 New Important Articles:</b>\n\n" + "".join(
-            f"<b>🔗 Title:</b> <a href=\"{article['url']}\">{article['title']}</a>\n"
-            f"<b>📝 Summary:</b> {article['summary']}\n\n"
+        return self.message_header + "".join([
+            self.article_template.format(
+                url=html.escape(article['url'] or ''),
+                title=html.escape(article['title'] or ''),
+                summary=html.escape(article['summary'])
+            )
             for article in articles
-        )
+        ])
 
-    def send_telegram_message(self, articles):
+    async def send_telegram_message(self, articles):
         message = self.format_telegram_message(articles)
         if not message:
             logging.info("No important articles to send.")
@@ -145,44 +639,50 @@ class NewsBlurTelegramBot:
         url = f"https://api.telegram.org/bot{self.tele_token}/sendMessage"
         payload = {'chat_id': self.tele_chat, 'text': message, 'parse_mode': 'HTML'}
         try:
-            response = self.session.post(url, data=payload)
+            response = await self.session.post(url, data=payload)
             response.raise_for_status()
             logging.info("Message sent to Telegram successfully")
-        except requests.RequestException as e:
-            logging.error(f"Failed to send message to Telegram: {e}")
-            logging.error(f"Payload used: {payload}")
-            logging.error(f"Telegram API URL: {url}")
+        except httpx.HTTPError as e:
+            # The error message contains the request URL, which includes the bot token
+            logging.error("Failed to send message to Telegram: %s", str(e).replace(self.tele_token, '<TELE_TOKEN>'))
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug("Payload used: %s", payload)
             logging.error("Make sure TELE_TOKEN and TELE_CHAT are correct and the bot has access to the specified chat.")
 
-    def job(self):
+    async def job(self):
         logging.debug("Job started.")
-        articles = self.fetch_newsblur_articles()
+        self.prune_cache()
+        articles = [story async for story in self.fetch_newsblur_articles()]
         if not articles:
             logging.info("No new articles found.")
-            return
+            if not self.pending_batches:
+                return
 
-        important_articles = self.filter_important_articles(articles)
+        if self.use_batch_api:
+            important_articles = await self.process_with_batch_api(articles)
+        else:
+            important_articles = await self.filter_important_articles(articles)
         if important_articles:
-            self.send_telegram_message(important_articles)
+            await self.send_telegram_message(important_articles)
         else:
             logging.info("No important articles found.")
 
         logging.debug("Job completed.")
 
-    def run(self):
+    async def run(self):
         # Run the job immediately
-        self.job()
+        await self.job()
 
         # Schedule the job every 60 minutes
-        schedule.every(60).minutes.do(self.job)
+        scheduler = AsyncIOScheduler()
+        scheduler.add_job(self.job, 'interval', minutes=60)
+        scheduler.start()
         logging.info("Scheduler started. Waiting for the next job to run...")
 
         # Keep the script running
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        await asyncio.Event().wait()
 
 
 if __name__ == "__main__":
     bot = NewsBlurTelegramBot()
-    bot.run()
+    asyncio.run(bot.run())